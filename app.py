@@ -1,51 +1,73 @@
-from flask import Flask, request, jsonify, render_template
+import eventlet
+eventlet.monkey_patch()
+
+from flask import Flask, Response, request, render_template, stream_with_context
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
+from flask_caching import Cache
 from dotenv import load_dotenv
+from bson import ObjectId
+from bson.errors import InvalidId
 import os
 from datetime import datetime, timedelta
-from apscheduler.schedulers.background import BackgroundScheduler
 import atexit
 import threading
 import time
 
+# Load .env before the service modules read their configuration
+load_dotenv()
+
 from services.threat_intel import ThreatIntelService
 from services.database import DatabaseService
 from services.visualization import VisualizationService
 from services.realtime_feeds import RealtimeFeedService
-
-load_dotenv()
+from services.scheduler import create_scheduler
+from services.serialization import dumps, socketio_options, SOCKETIO_SERIALIZER
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'cti-dashboard-secret-key')
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+
+REDIS_URL = os.getenv('REDIS_URL')
+MAX_SEARCH_LENGTH = 128
+
+# Response cache for read-only dashboard endpoints (Redis when configured)
+cache = Cache(app, config={
+    "CACHE_TYPE": "RedisCache" if REDIS_URL else "SimpleCache",
+    "CACHE_REDIS_URL": REDIS_URL,
+    "CACHE_KEY_PREFIX": "cti_dashboard:",
+    "CACHE_DEFAULT_TIMEOUT": 60
+})
+
+# Redis message queue lets worker.py and multiple app processes share emits
+# JSON (with pre-encoded broadcast payloads) or msgpack wire format
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet',
+                    message_queue=REDIS_URL, **socketio_options())
+
+@app.context_processor
+def inject_socketio_serializer():
+    # The client bundle must use the same parser as the server
+    return {"socketio_serializer": SOCKETIO_SERIALIZER}
+
+def ojsonify(obj):
+    """JSON response serialized with orjson (handles ObjectId and datetime)"""
+    return app.response_class(dumps(obj), mimetype='application/json')
 
 # Initialize services
 db_service = DatabaseService()
 threat_service = ThreatIntelService(db_service)
 viz_service = VisualizationService(db_service)
 realtime_service = RealtimeFeedService(db_service, socketio)
+atexit.register(threat_service.close)
 
-# Background scheduler for periodic data fetching
-scheduler = BackgroundScheduler()
-scheduler.add_job(
-    func=threat_service.fetch_all_feeds,
-    trigger="interval",
-    hours=1,
-    id='fetch_feeds'
-)
-scheduler.add_job(
-    func=realtime_service.fetch_live_threats,
-    trigger="interval",
-    minutes=2,  # Check for new threats every 2 minutes
-    id='realtime_feeds'
-)
-scheduler.start()
-atexit.register(lambda: scheduler.shutdown())
-
-# Start real-time threat monitoring
-realtime_service.start_monitoring()
+# Background jobs run here unless a separate worker.py process owns them
+if os.getenv('SEPARATE_WORKER', 'false').lower() != 'true':
+    scheduler = create_scheduler(db_service, threat_service, realtime_service)
+    scheduler.start()
+    atexit.register(lambda: scheduler.shutdown())
+    
+    # Start real-time threat monitoring
+    realtime_service.start_monitoring()
 
 @app.route('/')
 def dashboard():
@@ -55,9 +77,11 @@ def dashboard():
 def fetch_feeds():
     try:
         result = threat_service.fetch_all_feeds()
-        return jsonify({"status": "success", "data": result})
+        cache.clear()
+        viz_service.clear_cache()
+        return ojsonify({"status": "success", "data": result})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/lookup', methods=['POST'])
 def lookup_ioc():
@@ -67,42 +91,56 @@ def lookup_ioc():
         ioc_type = data.get('type')
         
         if not ioc or not ioc_type:
-            return jsonify({"status": "error", "message": "IOC and type required"}), 400
+            return ojsonify({"status": "error", "message": "IOC and type required"}), 400
         
         result = threat_service.lookup_ioc(ioc, ioc_type)
-        return jsonify({"status": "success", "data": result})
+        return ojsonify({"status": "success", "data": result})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/visuals/dashboard', methods=['GET'])
+@cache.cached(timeout=60)
 def get_dashboard_data():
     try:
         data = viz_service.get_dashboard_metrics()
-        return jsonify({"status": "success", "data": data})
+        return ojsonify({"status": "success", "data": data})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/visuals/trends', methods=['GET'])
+@cache.cached(timeout=300, query_string=True)
 def get_trends():
     try:
         days = request.args.get('days', 7, type=int)
         data = viz_service.get_threat_trends(days)
-        return jsonify({"status": "success", "data": data})
+        return ojsonify({"status": "success", "data": data})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/iocs', methods=['GET'])
 def get_iocs():
     try:
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 50, type=int)
-        search = request.args.get('search', '')
+        search = request.args.get('search', '').strip()
         tag_filter = request.args.get('tag', '')
         
-        data = db_service.get_iocs_paginated(page, limit, search, tag_filter)
-        return jsonify({"status": "success", "data": data})
+        if len(search) > MAX_SEARCH_LENGTH:
+            return ojsonify({"status": "error", "message": f"Search must be at most {MAX_SEARCH_LENGTH} characters"}), 400
+        
+        # Optional keyset cursor from a previous page's next_after
+        after = None
+        if request.args.get('after_ts'):
+            try:
+                after = (datetime.fromisoformat(request.args['after_ts']),
+                         ObjectId(request.args.get('after_id', '')))
+            except (ValueError, InvalidId):
+                return ojsonify({"status": "error", "message": "Invalid after_ts/after_id cursor"}), 400
+        
+        data = db_service.get_iocs_paginated(page, limit, search, tag_filter, after)
+        return ojsonify({"status": "success", "data": data})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/iocs/<ioc_id>/tag', methods=['POST'])
 def tag_ioc(ioc_id):
@@ -111,30 +149,41 @@ def tag_ioc(ioc_id):
         tags = data.get('tags', [])
         
         result = db_service.update_ioc_tags(ioc_id, tags)
-        return jsonify({"status": "success", "data": result})
+        if result:
+            threat_service.invalidate_lookup(result['value'], result['type'])
+        cache.clear()
+        viz_service.clear_cache()
+        return ojsonify({"status": "success", "data": result})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/export', methods=['GET'])
 def export_data():
     try:
         format_type = request.args.get('format', 'json')
         days = request.args.get('days', 30, type=int)
+        fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
         
-        data = db_service.export_iocs(days, format_type)
-        return jsonify({"status": "success", "data": data})
+        extension = 'csv' if format_type == 'csv' else 'json'
+        return Response(
+            stream_with_context(db_service.export_iocs_stream(days, format_type, fields)),
+            mimetype='text/csv' if extension == 'csv' else 'application/json',
+            headers={"Content-Disposition": f"attachment; filename=iocs_{days}days.{extension}"}
+        )
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/realtime/stats', methods=['GET'])
+@cache.cached(timeout=10)
 def get_realtime_stats():
     try:
         stats = realtime_service.get_live_stats()
-        return jsonify({"status": "success", "data": stats})
+        return ojsonify({"status": "success", "data": stats})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/threat-ips', methods=['GET'])
+@cache.cached(timeout=60, query_string=True)
 def get_threat_ips():
     try:
         limit = request.args.get('limit', 100, type=int)
@@ -145,33 +194,36 @@ def get_threat_ips():
         if classification:
             query["classification"] = classification
         
-        ips = list(db_service.iocs.find(query)
+        # Only fetch the fields the threat IP table renders
+        projection = {
+            "value": 1, "type": 1, "classification": 1, "threat_score": 1,
+            "sources": 1, "tags": 1, "timestamp": 1, "last_seen": 1
+        }
+        ips = list(db_service.iocs.find(query, projection)
                   .sort("threat_score", -1)
                   .limit(limit))
         
-        # Convert ObjectId to string
-        for ip in ips:
-            ip["_id"] = str(ip["_id"])
-        
-        return jsonify({"status": "success", "data": ips})
+        return ojsonify({"status": "success", "data": ips})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/threat-ips/<ip_address>/details', methods=['GET'])
 def get_ip_threat_details(ip_address):
     try:
         # Get IP IOC from database
-        ip_ioc = db_service.get_ioc(ip_address, 'ip')
+        ip_ioc = db_service.get_ioc(ip_address, 'ip', {
+            "threat_score": 1, "classification": 1, "timestamp": 1, "last_seen": 1, "sources": 1
+        })
         
         if not ip_ioc:
-            return jsonify({"status": "error", "message": "IP not found"}), 404
+            return ojsonify({"status": "error", "message": "IP not found"}), 404
         
         # Generate comprehensive threat intelligence data
         threat_details = threat_service.get_comprehensive_ip_data(ip_address, ip_ioc)
         
-        return jsonify({"status": "success", "data": threat_details})
+        return ojsonify({"status": "success", "data": threat_details})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/threat-ips/<ip_address>/timeline', methods=['GET'])
 def get_ip_threat_timeline(ip_address):
@@ -179,9 +231,9 @@ def get_ip_threat_timeline(ip_address):
         # Get threat timeline for specific IP
         timeline = db_service.get_ip_threat_timeline(ip_address)
         
-        return jsonify({"status": "success", "data": timeline})
+        return ojsonify({"status": "success", "data": timeline})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojsonify({"status": "error", "message": str(e)}), 500
 
 # WebSocket events
 @socketio.on('connect')
@@ -199,4 +251,5 @@ def handle_live_update():
     emit('live_stats_update', stats)
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    # For production use: gunicorn -k eventlet -w 1 -b 0.0.0.0:5000 app:app
+    socketio.run(app, host='0.0.0.0', port=5000)
\ No newline at end of file
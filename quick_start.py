@@ -8,6 +8,7 @@ import subprocess
 import time
 import sys
 import os
+import shutil
 from dotenv import load_dotenv
 
 def print_banner():
@@ -73,8 +74,7 @@ def setup_environment():
     """Setup environment variables"""
     if not os.path.exists('.env'):
         print("⚙️ Creating .env file...")
-        with open('.env.example', 'r') as src, open('.env', 'w') as dst:
-            dst.write(src.read())
+        shutil.copyfile('.env.example', '.env')
         print("✓ .env file created")
         print("📝 You can add your API keys to .env file later")
     else:
@@ -105,8 +105,14 @@ def start_application():
     print()
     
     try:
-        # Start the application
-        subprocess.run([sys.executable, 'run.py'])
+        # Start the application (gunicorn is not available on Windows)
+        if os.name == 'nt' or shutil.which('gunicorn') is None:
+            # Run in-process rather than paying for a second interpreter
+            from app import app, socketio
+            socketio.run(app, host='0.0.0.0', port=5000)
+        else:
+            from run import GUNICORN_ARGS
+            subprocess.run(GUNICORN_ARGS)
     except KeyboardInterrupt:
         print("\n👋 Stopping CTI Dashboard...")
         stop_services()
@@ -6,26 +6,37 @@ Handles environment setup and application initialization
 
 import os
 import sys
+import importlib.util
 from dotenv import load_dotenv
 
+# Production server: eventlet worker handles WebSockets natively. The worker
+# count comes from WEB_CONCURRENCY (default 1, as Socket.IO polling needs
+# sticky sessions across workers)
+GUNICORN_ARGS = [
+    'gunicorn', '-k', 'eventlet',
+    '-w', os.getenv('WEB_CONCURRENCY', '1'),
+    '--worker-connections', '1000',
+    '-b', '0.0.0.0:5000',
+    'app:app'
+]
+
 def check_dependencies():
-    """Check if all required dependencies are available"""
-    try:
-        import flask
-        import pymongo
-        import requests
-        print("✓ All Python dependencies are available")
-        return True
-    except ImportError as e:
-        print(f"✗ Missing dependency: {e}")
+    """Check if all required dependencies are available (without importing them)"""
+    missing = [name for name in ('flask', 'pymongo', 'requests')
+               if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"✗ Missing dependency: {', '.join(missing)}")
         print("Please run: pip install -r requirements.txt")
         return False
+    print("✓ All Python dependencies are available")
+    return True
 
 def check_mongodb():
     """Check MongoDB connection"""
     try:
         from pymongo import MongoClient
-        client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'))
+        client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'),
+                             serverSelectionTimeoutMS=2000)
         client.server_info()
         print("✓ MongoDB connection successful")
         return True
@@ -88,6 +99,10 @@ def main():
     print("📊 Dashboard will be available at: http://localhost:5000")
     print("=" * 50)
     
+    # Production runs under gunicorn unless --dev is given
+    if os.getenv('CTI_ENV') == 'prod' and '--dev' not in sys.argv:
+        os.execvp(GUNICORN_ARGS[0], GUNICORN_ARGS)
+    
     # Import and run the Flask app with SocketIO
     try:
         from app import app, socketio
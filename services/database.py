@@ -1,104 +1,285 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import OperationFailure
 from datetime import datetime, timedelta
 import os
-import json
+import re
 import csv
 from io import StringIO
+from collections import Counter
+
+from services.serialization import dumps
+
+MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
+DATABASE_NAME = os.getenv('DATABASE_NAME', 'cti_dashboard')
+
+# Internal search field, kept out of API responses and exports
+HIDE_INTERNAL = {"value_lower": 0}
+
+# Indexes only need to be ensured once per process
+_indexes_created = False
+
+# One pooled client per process, shared by every DatabaseService
+_client = None
+
+def get_client():
+    """Get the shared, pool-tuned MongoClient"""
+    global _client
+    if _client is None:
+        _client = MongoClient(
+            MONGODB_URI,
+            maxPoolSize=200,
+            minPoolSize=20,
+            maxIdleTimeMS=60000,
+            waitQueueTimeoutMS=2500,
+            socketTimeoutMS=10000,
+            compressors='zstd,zlib',
+            retryWrites=True
+        )
+    return _client
 
 class DatabaseService:
     def __init__(self):
-        self.client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'))
-        self.db = self.client[os.getenv('DATABASE_NAME', 'cti_dashboard')]
+        self.client = get_client()
+        self.db = self.client[DATABASE_NAME]
         self.iocs = self.db.iocs
         self.feeds = self.db.feeds
+        # Materialized dashboard counters, kept in step with inserts
+        self.metrics_daily = self.db.metrics_daily
+        self.metrics_summary = self.db.metrics_summary
+        
+        if not _indexes_created:
+            self.ensure_indexes()
+    
+    def ensure_indexes(self):
+        """Create indexes for better performance"""
+        global _indexes_created
         
-        # Create indexes for better performance
-        self.iocs.create_index([("value", 1), ("type", 1)])
-        self.iocs.create_index("timestamp")
+        # Unique so concurrent upserts of the same IOC can't insert duplicates
+        try:
+            self.iocs.create_index([("value", 1), ("type", 1)], unique=True)
+        except OperationFailure as e:
+            # Older databases keep their non-unique index (or already hold duplicates)
+            print(f"Unique (value, type) index not created: {e}")
+        # Newest-first listing and keyset pages walk this index; it also serves
+        # timestamp range queries
+        self.iocs.create_index([("timestamp", -1), ("_id", -1)])
+        # Lets the live stats aggregation read timestamp/classification from the index
+        self.iocs.create_index([("timestamp", 1), ("classification", 1)])
         self.iocs.create_index("tags")
+        # Equality fields first, sort field last so /api/threat-ips can walk
+        # the index in threat_score order and stop at the limit
+        self.iocs.create_index([("type", 1), ("threat_score", -1)])
+        # Also serves (type) and (type, classification) prefix queries
+        self.iocs.create_index([("type", 1), ("classification", 1), ("threat_score", -1)])
+        # Serves the top_malicious $in + sort as a merge of sorted index ranges
+        self.iocs.create_index([("classification", 1), ("threat_score", -1)])
+        self.iocs.create_index([("value", "text"), ("description", "text")])
+        # Case-insensitive prefix search; backfill documents stored before the field existed
+        self.iocs.create_index("value_lower")
+        self.iocs.update_many(
+            {"value_lower": {"$exists": False}},
+            [{"$set": {"value_lower": {"$toLower": "$value"}}}]
+        )
+        self.metrics_daily.create_index([("date", 1), ("classification", 1)], unique=True)
+        # Deployments without the scheduler never run rebuild_metrics, so seed
+        # the counters here or existing IOCs never reach the dashboard
+        if self.metrics_summary.estimated_document_count() == 0 and self.iocs.estimated_document_count():
+            try:
+                self.rebuild_metrics()
+            except Exception as e:
+                print(f"Error backfilling dashboard metrics: {e}")
+        _indexes_created = True
+    
+    def _ioc_upsert(self, ioc_data, now):
+        """Build the dedup filter and update pipeline for an IOC upsert"""
+        query = {"value": ioc_data["value"], "type": ioc_data["type"]}
+        
+        # Fields other than the merged ones are only written on insert
+        update_fields = {
+            field: {"$ifNull": [f"${field}", {"$literal": value}]}
+            for field, value in ioc_data.items()
+            if field not in ("_id", "sources", "threat_score", "winning_source", "timestamp", "last_seen",
+                             "tags", "value_lower")
+        }
+        if "winning_source" in ioc_data:
+            # Follows threat_score: the source only changes when the new score wins
+            update_fields["winning_source"] = {"$cond": [
+                {"$gt": [ioc_data.get("threat_score", 0), {"$ifNull": ["$threat_score", -1]}]},
+                {"$literal": ioc_data["winning_source"]},
+                {"$ifNull": ["$winning_source", {"$literal": ioc_data["winning_source"]}]}
+            ]}
+        update_fields.update({
+            "value_lower": {"$literal": ioc_data["value"].lower()},
+            "last_seen": now,
+            "sources": {"$setUnion": [
+                {"$ifNull": ["$sources", []]},
+                {"$literal": ioc_data.get("sources", [])}
+            ]},
+            "threat_score": {"$max": ["$threat_score", ioc_data.get("threat_score", 0)]},
+            "timestamp": {"$ifNull": ["$timestamp", now]},
+            "tags": {"$ifNull": ["$tags", {"$literal": ioc_data.get("tags", [])}]}
+        })
+        return query, [{"$set": update_fields}]
     
     def store_ioc(self, ioc_data):
         """Store IOC with deduplication"""
-        existing = self.iocs.find_one({
-            "value": ioc_data["value"],
-            "type": ioc_data["type"]
-        })
+        now = datetime.utcnow()
+        # MongoDB stores dates with millisecond precision
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
         
-        if existing:
-            # Update existing IOC with new data
-            update_data = {
-                "last_seen": datetime.utcnow(),
-                "sources": list(set(existing.get("sources", []) + ioc_data.get("sources", []))),
-                "threat_score": max(existing.get("threat_score", 0), ioc_data.get("threat_score", 0))
-            }
-            self.iocs.update_one({"_id": existing["_id"]}, {"$set": update_data})
-            return existing["_id"]
-        else:
-            # Insert new IOC
-            ioc_data["timestamp"] = datetime.utcnow()
-            ioc_data["last_seen"] = datetime.utcnow()
-            ioc_data["tags"] = ioc_data.get("tags", [])
-            result = self.iocs.insert_one(ioc_data)
-            return result.inserted_id
+        query, pipeline = self._ioc_upsert(ioc_data, now)
+        result = self.iocs.find_one_and_update(
+            query,
+            pipeline,
+            projection={"_id": 1, "timestamp": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if result.get("timestamp") == now:
+            self._record_inserted_iocs([ioc_data], now)
+        return result["_id"]
+    
+    def bulk_store_iocs(self, iocs, batch_size=500):
+        """Store many IOCs with deduplication using batched upserts"""
+        now = datetime.utcnow()
+        stored = 0
+        
+        for start in range(0, len(iocs), batch_size):
+            batch = iocs[start:start + batch_size]
+            operations = [
+                UpdateOne(*self._ioc_upsert(ioc_data, now), upsert=True)
+                for ioc_data in batch
+            ]
+            result = self.iocs.bulk_write(operations, ordered=False)
+            stored += result.upserted_count + result.matched_count
+            self._record_inserted_iocs([batch[index] for index in result.upserted_ids], now)
+        
+        return stored
+    
+    def _record_inserted_iocs(self, inserted, now):
+        """Fold newly inserted IOCs into the materialized dashboard metrics"""
+        if not inserted:
+            return
+        
+        date = now.strftime("%Y-%m-%d")
+        counts = Counter(ioc_data.get("classification") or "unknown" for ioc_data in inserted)
+        
+        self.metrics_daily.bulk_write([
+            UpdateOne({"date": date, "classification": classification},
+                      {"$inc": {"count": count}}, upsert=True)
+            for classification, count in counts.items()
+        ], ordered=False)
+        self.metrics_summary.bulk_write([
+            UpdateOne({"_id": classification}, {"$inc": {"count": count}}, upsert=True)
+            for classification, count in counts.items()
+        ], ordered=False)
+    
+    def rebuild_metrics(self):
+        """Recompute the materialized dashboard metrics from the IOC collection"""
+        classification = {"$ifNull": ["$classification", "unknown"]}
+        
+        self.iocs.aggregate([
+            {
+                "$group": {
+                    "_id": {
+                        "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                        "classification": classification
+                    },
+                    "count": {"$sum": 1}
+                }
+            },
+            {"$project": {"_id": 0, "date": "$_id.date", "classification": "$_id.classification", "count": 1}},
+            {"$merge": {"into": "metrics_daily", "on": ["date", "classification"],
+                        "whenMatched": "replace", "whenNotMatched": "insert"}}
+        ])
+        self.iocs.aggregate([
+            {"$group": {"_id": classification, "count": {"$sum": 1}}},
+            {"$merge": {"into": "metrics_summary", "whenMatched": "replace", "whenNotMatched": "insert"}}
+        ])
     
-    def get_ioc(self, value, ioc_type):
-        """Get IOC by value and type"""
-        return self.iocs.find_one({"value": value, "type": ioc_type})
+    def get_ioc(self, value, ioc_type, projection=None):
+        """Get IOC by value and type, optionally limited to given fields"""
+        return self.iocs.find_one({"value": value, "type": ioc_type}, projection or HIDE_INTERNAL)
     
-    def get_iocs_paginated(self, page=1, limit=50, search="", tag_filter=""):
+    def get_iocs_paginated(self, page=1, limit=50, search="", tag_filter="", after=None):
         """Get paginated IOCs with search and filtering"""
         query = {}
         
         if search:
+            # Case-insensitive prefix match on the lowercased value index for
+            # IPs/domains/URLs/hashes, text index for whole (stemmed) description words
             query["$or"] = [
-                {"value": {"$regex": search, "$options": "i"}},
-                {"description": {"$regex": search, "$options": "i"}}
+                {"value_lower": {"$regex": f"^{re.escape(search.lower())}"}},
+                {"$text": {"$search": search}}
             ]
         
         if tag_filter:
             query["tags"] = tag_filter
         
-        skip = (page - 1) * limit
-        total = self.iocs.count_documents(query)
-        
-        iocs = list(self.iocs.find(query)
-                   .sort("timestamp", -1)
-                   .skip(skip)
-                   .limit(limit))
+        sort = [("timestamp", -1), ("_id", -1)]
+        if after:
+            # Keyset cursor (timestamp, _id) from a previous page's next_after: walks
+            # the (timestamp, _id) index from the cursor and stops at the limit. _id
+            # breaks ties between IOCs stored together. A count below the cursor
+            # would shrink every page, so keyset responses carry no total/pages
+            after_ts, after_id = after
+            keyset = {"$or": [
+                {"timestamp": {"$lt": after_ts}},
+                {"timestamp": after_ts, "_id": {"$lt": after_id}}
+            ]}
+            query = {"$and": [query, keyset]} if query else keyset
+            iocs = list(self.iocs.find(query, HIDE_INTERNAL).sort(sort).limit(limit))
+            total = None
+        elif not query:
+            # Unfiltered listing: count from collection metadata instead of a scan
+            total = self.iocs.estimated_document_count()
+            iocs = list(self.iocs.find({}, HIDE_INTERNAL).sort(sort).skip((page - 1) * limit).limit(limit))
+        else:
+            # Page and count in one round trip; sorting before $facet lets the
+            # sort use the index
+            result = next(self.iocs.aggregate([
+                {"$match": query},
+                {"$sort": dict(sort)},
+                {"$facet": {
+                    "iocs": [{"$skip": (page - 1) * limit}, {"$limit": limit}, {"$project": HIDE_INTERNAL}],
+                    "total": [{"$count": "n"}]
+                }}
+            ]), {"iocs": [], "total": []})
+            iocs = result["iocs"]
+            total = result["total"][0]["n"] if result["total"] else 0
         
-        # Convert ObjectId to string for JSON serialization
-        for ioc in iocs:
-            ioc["_id"] = str(ioc["_id"])
+        next_after = None
+        if len(iocs) == limit:
+            next_after = {"after_ts": iocs[-1]["timestamp"].isoformat(), "after_id": str(iocs[-1]["_id"])}
         
         return {
             "iocs": iocs,
             "total": total,
             "page": page,
-            "pages": (total + limit - 1) // limit
+            "pages": None if total is None else (total + limit - 1) // limit,
+            "next_after": next_after
         }
     
     def update_ioc_tags(self, ioc_id, tags):
-        """Update IOC tags"""
+        """Update IOC tags and return the updated IOC (None if not found)"""
         from bson import ObjectId
-        result = self.iocs.update_one(
+        return self.iocs.find_one_and_update(
             {"_id": ObjectId(ioc_id)},
-            {"$set": {"tags": tags}}
+            {"$set": {"tags": tags}},
+            projection={"tags": 1, "value": 1, "type": 1},
+            return_document=ReturnDocument.AFTER
         )
-        return result.modified_count > 0
     
     def get_threat_stats(self):
         """Get threat statistics for dashboard"""
         try:
-            pipeline = [
-                {
-                    "$group": {
-                        "_id": "$classification",
-                        "count": {"$sum": 1}
-                    }
-                }
-            ]
-            
-            stats = list(self.iocs.aggregate(pipeline))
+            stats = list(self.metrics_summary.find())
+            if not stats:
+                # Metrics not materialized yet; count live
+                stats = list(self.iocs.aggregate([
+                    {"$group": {"_id": {"$ifNull": ["$classification", "unknown"]}, "count": {"$sum": 1}}}
+                ]))
             
             # Get recent IOCs count (last 24 hours)
             recent_count = self.iocs.count_documents({
@@ -106,19 +287,16 @@ class DatabaseService:
             })
             
             # Get top malicious IPs/domains (use different classification values)
-            top_malicious = list(self.iocs.find({
-                "$or": [
-                    {"classification": "critical"},
-                    {"classification": "high"},
-                    {"classification": "malicious"}
-                ]
-            }).sort("threat_score", -1).limit(10))
+            top_malicious = list(self.iocs.find(
+                {"classification": {"$in": ["critical", "high", "malicious"]}},
+                {"value": 1, "type": 1, "classification": 1, "threat_score": 1}
+            ).sort("threat_score", -1).limit(10))
             
             return {
                 "classification_stats": stats,
                 "recent_count": recent_count,
                 "top_malicious": top_malicious,
-                "total_iocs": self.iocs.count_documents({})
+                "total_iocs": self.iocs.estimated_document_count()
             }
         except Exception as e:
             print(f"Error getting threat stats: {e}")
@@ -131,48 +309,73 @@ class DatabaseService:
     
     def get_trends_data(self, days=7):
         """Get trend data for specified number of days"""
-        start_date = datetime.utcnow() - timedelta(days=days)
+        start_date = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d")
+        
+        if self.metrics_summary.estimated_document_count() == 0:
+            # Metrics not materialized yet; group the IOCs live
+            return list(self.iocs.aggregate([
+                {"$match": {"timestamp": {"$gte": datetime.strptime(start_date, "%Y-%m-%d")}}},
+                {
+                    "$group": {
+                        "_id": {
+                            "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                            "classification": {"$ifNull": ["$classification", "unknown"]}
+                        },
+                        "count": {"$sum": 1}
+                    }
+                },
+                {"$sort": {"_id.date": 1}}
+            ]))
+        
+        daily = self.metrics_daily.find({"date": {"$gte": start_date}}).sort("date", 1)
         
-        pipeline = [
-            {"$match": {"timestamp": {"$gte": start_date}}},
+        return [
             {
-                "$group": {
-                    "_id": {
-                        "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
-                        "classification": "$classification"
-                    },
-                    "count": {"$sum": 1}
-                }
-            },
-            {"$sort": {"_id.date": 1}}
+                "_id": {"date": item["date"], "classification": item["classification"]},
+                "count": item["count"]
+            } for item in daily
         ]
-        
-        return list(self.iocs.aggregate(pipeline))
     
-    def export_iocs(self, days=30, format_type="json"):
-        """Export IOCs in specified format"""
+    def export_iocs_stream(self, days=30, format_type="json", fields=None):
+        """Yield an IOC export in the specified format chunk by chunk"""
         start_date = datetime.utcnow() - timedelta(days=days)
+        projection = {field: 1 for field in fields} if fields else HIDE_INTERNAL
         
-        iocs = list(self.iocs.find(
-            {"timestamp": {"$gte": start_date}}
-        ).sort("timestamp", -1))
-        
-        # Convert ObjectId to string
-        for ioc in iocs:
-            ioc["_id"] = str(ioc["_id"])
-            ioc["timestamp"] = ioc["timestamp"].isoformat()
-            ioc["last_seen"] = ioc["last_seen"].isoformat()
+        cursor = self.iocs.find(
+            {"timestamp": {"$gte": start_date}},
+            projection
+        ).sort("timestamp", -1).batch_size(500)
         
         if format_type == "csv":
             output = StringIO()
-            if iocs:
-                fieldnames = iocs[0].keys()
-                writer = csv.DictWriter(output, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(iocs)
-            return output.getvalue()
+            writer = None
+            for ioc in cursor:
+                ioc = self._serialize_export_ioc(ioc)
+                if writer is None:
+                    writer = csv.DictWriter(output, fieldnames=fields or list(ioc.keys()),
+                                            extrasaction="ignore")
+                    writer.writeheader()
+                writer.writerow(ioc)
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
         else:
-            return json.dumps(iocs, indent=2)
+            yield "["
+            for index, ioc in enumerate(cursor):
+                yield ("," if index else "") + "\n" + dumps(ioc, indent=True).decode()
+            yield "\n]"
+    
+    def export_iocs(self, days=30, format_type="json", fields=None):
+        """Export IOCs in specified format, optionally limited to given fields"""
+        return "".join(self.export_iocs_stream(days, format_type, fields))
+    
+    def _serialize_export_ioc(self, ioc):
+        """Convert ObjectId and datetime values to strings"""
+        ioc["_id"] = str(ioc["_id"])
+        for key in ("timestamp", "last_seen"):
+            if key in ioc:
+                ioc[key] = ioc[key].isoformat()
+        return ioc
     
     def store_feed_data(self, feed_name, data):
         """Store feed data with timestamp"""
@@ -186,21 +389,28 @@ class DatabaseService:
     def get_ip_threat_timeline(self, ip_address):
         """Get threat timeline for a specific IP"""
         try:
-            # Get all IOCs for this IP
-            iocs = list(self.iocs.find({"value": ip_address, "type": "ip"}).sort("timestamp", -1))
+            classification = {"$ifNull": ["$classification", "unknown"]}
             
-            timeline = []
-            for ioc in iocs:
-                timeline.append({
-                    "timestamp": ioc.get("timestamp", datetime.utcnow()).isoformat(),
-                    "event": f"Threat Detection - {ioc.get('classification', 'unknown').title()}",
-                    "description": ioc.get("description", "Malicious activity detected"),
-                    "severity": ioc.get("classification", "medium"),
-                    "source": ioc.get("sources", ["unknown"])[0] if ioc.get("sources") else "unknown",
-                    "threat_score": ioc.get("threat_score", 0)
-                })
-            
-            return timeline
+            # Build timeline entries server-side for all IOCs of this IP
+            return list(self.iocs.aggregate([
+                {"$match": {"value": ip_address, "type": "ip"}},
+                {"$sort": {"timestamp": -1}},
+                {
+                    "$project": {
+                        "_id": 0,
+                        "timestamp": {"$ifNull": ["$timestamp", "$$NOW"]},
+                        "event": {"$concat": [
+                            "Threat Detection - ",
+                            {"$toUpper": {"$substrCP": [classification, 0, 1]}},
+                            {"$substrCP": [classification, 1, {"$strLenCP": classification}]}
+                        ]},
+                        "description": {"$ifNull": ["$description", "Malicious activity detected"]},
+                        "severity": {"$ifNull": ["$classification", "medium"]},
+                        "source": {"$ifNull": [{"$arrayElemAt": ["$sources", 0]}, "unknown"]},
+                        "threat_score": {"$ifNull": ["$threat_score", 0]}
+                    }
+                }
+            ]))
         except Exception as e:
             print(f"Error getting IP timeline: {e}")
-            return []
\ No newline at end of file
+            return []
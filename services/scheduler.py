@@ -0,0 +1,34 @@
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.executors.pool import ThreadPoolExecutor
+from datetime import datetime
+
+def create_scheduler(db_service, threat_service, realtime_service):
+    """Build the background scheduler for periodic data fetching"""
+    # Never run a job concurrently with itself; collapse missed runs into one
+    scheduler = BackgroundScheduler(
+        executors={'default': ThreadPoolExecutor(4)},
+        job_defaults={'coalesce': True, 'max_instances': 1, 'misfire_grace_time': 300}
+    )
+    scheduler.add_job(
+        func=threat_service.fetch_all_feeds,
+        trigger="interval",
+        hours=1,
+        jitter=60,
+        id='fetch_feeds'
+    )
+    scheduler.add_job(
+        func=realtime_service.fetch_live_threats,
+        trigger="interval",
+        minutes=2,  # Check for new threats every 2 minutes
+        jitter=10,
+        id='realtime_feeds'
+    )
+    scheduler.add_job(
+        func=db_service.rebuild_metrics,
+        trigger="interval",
+        hours=1,
+        jitter=60,
+        next_run_time=datetime.now(),  # Backfill metrics on startup
+        id='rebuild_metrics'
+    )
+    return scheduler
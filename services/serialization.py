@@ -0,0 +1,73 @@
+import os
+import orjson
+from datetime import datetime
+from bson import ObjectId
+
+# Socket.IO wire format: 'json' (default) or 'msgpack' for binary frames
+SOCKETIO_SERIALIZER = os.getenv('SOCKETIO_SERIALIZER', 'json')
+
+def _default(obj):
+    """Serialize BSON types that orjson does not handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps(obj, indent=False):
+    """Serialize documents (including ObjectId and naive UTC datetimes) to JSON bytes"""
+    option = orjson.OPT_NAIVE_UTC
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, default=_default, option=option)
+
+# Socket.IO payloads: naive datetimes are UTC and go out with a 'Z' suffix so
+# browsers parse them as UTC rather than local time
+SOCKETIO_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+class PreEncoded(str):
+    """JSON text encoded once and spliced verbatim into every Socket.IO packet"""
+
+def preencode(obj):
+    """Encode an emit payload once so broadcasts do not re-serialize it"""
+    # Kept as JSON text rather than a binary attachment: the packet is already
+    # encoded once per emit and shared by all recipients, while attachments
+    # cost an extra frame per client and are base64-encoded on the Redis queue
+    if SOCKETIO_SERIALIZER == 'msgpack':
+        # msgpack packets are packed whole by the packet class
+        return obj
+    return PreEncoded(orjson.dumps(obj, default=_default, option=SOCKETIO_OPTIONS).decode())
+
+def _socketio_default(obj):
+    if isinstance(obj, PreEncoded):
+        return orjson.Fragment(str(obj))
+    if isinstance(obj, str):
+        return str(obj)
+    return _default(obj)
+
+class SocketIOJSON:
+    """json module replacement for Socket.IO packets (pass as SocketIO(json=...))"""
+    
+    @staticmethod
+    def dumps(obj, **kwargs):
+        # Subclasses are passed to the default hook so PreEncoded is not quoted
+        return orjson.dumps(
+            obj,
+            default=_socketio_default,
+            option=SOCKETIO_OPTIONS | orjson.OPT_PASSTHROUGH_SUBCLASS
+        ).decode()
+    
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+def _msgpack_default(obj):
+    if isinstance(obj, datetime):
+        # Match the JSON wire format: naive datetimes are UTC
+        return obj.isoformat() + 'Z' if obj.tzinfo is None else obj.isoformat()
+    return _default(obj)
+
+def socketio_options():
+    """SocketIO constructor options for the configured wire format"""
+    if SOCKETIO_SERIALIZER == 'msgpack':
+        from socketio.msgpack_packet import MsgPackPacket
+        return {'serializer': MsgPackPacket.configure(dumps_default=_msgpack_default)}
+    return {'json': SocketIOJSON}
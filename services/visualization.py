@@ -1,25 +1,80 @@
 from datetime import datetime, timedelta
+from itertools import product
 import json
+import threading
+import time
+import numpy as np
+
+# Hour-of-day mask for the hourly fallback: higher activity during business hours
+BUSINESS_HOURS = (np.arange(24) >= 8) & (np.arange(24) <= 18)
 
 class VisualizationService:
     def __init__(self, db_service):
         self.db = db_service
+        self._rng = np.random.default_rng()
+        
+        # Concurrent dashboard refreshes share one computation per TTL
+        self.metrics_cache_ttl = 15
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+        self._inflight = {}
+    
+    def _memoized(self, key, compute):
+        """Return a result computed less than metrics_cache_ttl ago, computing it once per key at a time"""
+        hit = self._memo.get(key)
+        if hit and time.monotonic() - hit[0] < self.metrics_cache_ttl:
+            return hit[1]
+        
+        with self._memo_lock:
+            hit = self._memo.get(key)
+            if hit and time.monotonic() - hit[0] < self.metrics_cache_ttl:
+                return hit[1]
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+        
+        if not leader:
+            # Wait for the in-flight computation instead of piling onto Mongo
+            event.wait()
+            hit = self._memo.get(key)
+            return hit[1] if hit else compute()
+        
+        try:
+            value = compute()
+            now = time.monotonic()
+            with self._memo_lock:
+                self._memo = {k: v for k, v in self._memo.items() if now - v[0] < self.metrics_cache_ttl}
+                self._memo[key] = (now, value)
+            return value
+        finally:
+            with self._memo_lock:
+                del self._inflight[key]
+            event.set()
+    
+    def clear_cache(self):
+        """Forget memoized results after the underlying IOCs change"""
+        with self._memo_lock:
+            self._memo = {}
     
     def get_dashboard_metrics(self):
         """Get key metrics for dashboard overview"""
+        return self._memoized(("dashboard",), self._compute_dashboard_metrics)
+    
+    def _compute_dashboard_metrics(self):
+        """Compute dashboard overview metrics from MongoDB"""
         try:
             stats = self.db.get_threat_stats()
+            now = datetime.utcnow()
+            day_ago = now - timedelta(hours=24)
             
-            # Calculate threat level based on recent activity
-            recent_critical = self.db.iocs.count_documents({
-                "classification": "critical",
-                "timestamp": {"$gte": datetime.utcnow() - timedelta(hours=24)}
-            })
+            # Run every dashboard aggregation in one round trip and one collection scan
+            facets = self._get_dashboard_facets(day_ago)
             
-            recent_high = self.db.iocs.count_documents({
-                "classification": "high", 
-                "timestamp": {"$gte": datetime.utcnow() - timedelta(hours=24)}
-            })
+            # Calculate threat level based on recent activity
+            recent = {item["_id"]: item["count"] for item in facets.get("recent", [])}
+            recent_critical = recent.get("critical", 0)
+            recent_high = recent.get("high", 0)
             
             # Determine overall threat level
             if recent_critical > 10:
@@ -32,16 +87,16 @@ class VisualizationService:
                 overall_threat_level = "low"
             
             # Get geo distribution
-            geo_data = self._get_geo_distribution()
+            geo_data = self._get_geo_distribution(facets.get("geo"))
             
             # Get attack types distribution
-            attack_types = self._get_attack_types()
+            attack_types = self._get_attack_types(facets.get("attacks"))
             
             # Get threat type breakdown for charts
-            threat_type_stats = self._get_threat_type_breakdown()
+            threat_type_stats = self._get_threat_type_breakdown(facets.get("breakdown"))
             
             # Get hourly threat activity
-            hourly_activity = self._get_hourly_activity()
+            hourly_activity = self._get_hourly_activity(facets.get("hourly"))
             
             return {
                 "overall_threat_level": overall_threat_level,
@@ -53,7 +108,7 @@ class VisualizationService:
                 "attack_types": attack_types,
                 "threat_type_stats": threat_type_stats,
                 "hourly_activity": hourly_activity,
-                "last_updated": datetime.utcnow().isoformat()
+                "last_updated": now.isoformat()
             }
         except Exception as e:
             print(f"Error getting dashboard metrics: {e}")
@@ -73,6 +128,10 @@ class VisualizationService:
     
     def get_threat_trends(self, days=7):
         """Get threat trends over specified period"""
+        return self._memoized(("trends", days), lambda: self._compute_threat_trends(days))
+    
+    def _compute_threat_trends(self, days):
+        """Compute per-day classification counts for the trends chart"""
         trends_data = self.db.get_trends_data(days)
         
         # Process data for frontend charts
@@ -97,38 +156,104 @@ class VisualizationService:
         }
         
         # Fill in actual data
+        date_to_idx = {date: i for i, date in enumerate(dates)}
         for item in trends_data:
             date = item["_id"]["date"]
             classification = item["_id"]["classification"]
             count = item["count"]
             
-            if date in dates and classification in chart_data["datasets"]:
-                date_index = dates.index(date)
+            date_index = date_to_idx.get(date)
+            if date_index is not None and classification in chart_data["datasets"]:
                 chart_data["datasets"][classification][date_index] = count
         
         return chart_data
     
-    def _get_geo_distribution(self):
-        """Get geographical distribution of threats (simplified)"""
-        # This would typically aggregate by country from IOC details
-        # For now, returning mock data structure
+    def _get_dashboard_facets(self, day_ago):
+        """Run the dashboard sub-aggregations as a single $facet pipeline ({} on error)"""
+        facets = {
+            "recent": [
+                {"$match": {
+                    "classification": {"$in": ["critical", "high"]},
+                    "timestamp": {"$gte": day_ago}
+                }},
+                {"$group": {"_id": "$classification", "count": {"$sum": 1}}}
+            ],
+            # This would typically aggregate by country from IOC details
+            "geo": [
+                {"$match": {"source_details.details.country_code": {"$exists": True}}},
+                {"$unwind": "$source_details"},
+                {
+                    "$group": {
+                        "_id": "$source_details.details.country_code",
+                        "count": {"$sum": 1}
+                    }
+                },
+                {"$sort": {"count": -1}},
+                {"$limit": 10}
+            ],
+            "attacks": [
+                {"$unwind": "$tags"},
+                {
+                    "$group": {
+                        "_id": "$tags",
+                        "count": {"$sum": 1}
+                    }
+                },
+                {"$sort": {"count": -1}},
+                {"$limit": 10}
+            ],
+            "breakdown": [
+                {
+                    "$group": {
+                        "_id": {
+                            "type": "$type",
+                            "classification": "$classification"
+                        },
+                        "count": {"$sum": 1}
+                    }
+                },
+                {"$sort": {"count": -1}}
+            ],
+            "hourly": [
+                {"$match": {"timestamp": {"$gte": day_ago}}},
+                {
+                    "$group": {
+                        "_id": {
+                            "hour": {"$hour": "$timestamp"},
+                            "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}
+                        },
+                        "count": {"$sum": 1}
+                    }
+                },
+                {"$sort": {"_id.hour": 1}}
+            ]
+        }
+        
+        # The facets need a full scan anyway (no index is usable inside $facet),
+        # so trim each document to the fields they read before fanning it out
         pipeline = [
-            {"$match": {"source_details.details.country_code": {"$exists": True}}},
-            {"$unwind": "$source_details"},
-            {
-                "$group": {
-                    "_id": "$source_details.details.country_code",
-                    "count": {"$sum": 1}
-                }
-            },
-            {"$sort": {"count": -1}},
-            {"$limit": 10}
+            {"$project": {
+                "_id": 0,
+                "type": 1,
+                "classification": 1,
+                "timestamp": 1,
+                "tags": 1,
+                "source_details.details.country_code": 1
+            }},
+            {"$facet": facets}
         ]
         
         try:
-            geo_data = list(self.db.iocs.aggregate(pipeline))
+            return next(self.db.iocs.aggregate(pipeline, allowDiskUse=True))
+        except Exception as e:
+            print(f"Error aggregating dashboard metrics: {e}")
+            return {}
+    
+    def _get_geo_distribution(self, geo_data):
+        """Format geographical distribution of threats (simplified)"""
+        if geo_data is not None:
             return [{"country": item["_id"], "count": item["count"]} for item in geo_data]
-        except:
+        else:
             # Fallback mock data
             return [
                 {"country": "US", "count": 45},
@@ -138,126 +263,55 @@ class VisualizationService:
                 {"country": "GB", "count": 12}
             ]
     
-    def _get_attack_types(self):
-        """Get distribution of attack types based on tags"""
-        pipeline = [
-            {"$unwind": "$tags"},
-            {
-                "$group": {
-                    "_id": "$tags",
-                    "count": {"$sum": 1}
-                }
-            },
-            {"$sort": {"count": -1}},
-            {"$limit": 10}
-        ]
-        
-        try:
-            attack_data = list(self.db.iocs.aggregate(pipeline))
-            if attack_data:
-                return [{"type": item["_id"], "count": item["count"]} for item in attack_data]
-        except Exception as e:
-            print(f"Error getting attack types: {e}")
+    def _get_attack_types(self, attack_data):
+        """Format distribution of attack types based on tags"""
+        if attack_data:
+            return [{"type": item["_id"], "count": item["count"]} for item in attack_data]
         
-        # Fallback mock data with realistic numbers
-        import random
-        return [
-            {"type": "malware", "count": random.randint(20, 35)},
-            {"type": "phishing", "count": random.randint(15, 25)},
-            {"type": "botnet", "count": random.randint(10, 20)},
-            {"type": "c2", "count": random.randint(8, 15)},
-            {"type": "ransomware", "count": random.randint(5, 12)},
-            {"type": "suspicious_ip", "count": random.randint(12, 18)}
-        ]
+        # Fallback mock data with realistic numbers, drawn in one batch
+        types = ["malware", "phishing", "botnet", "c2", "ransomware", "suspicious_ip"]
+        lows = np.array([20, 15, 10, 8, 5, 12])
+        highs = np.array([35, 25, 20, 15, 12, 18])
+        counts = self._rng.integers(lows, highs + 1).tolist()
+        return [{"type": t_type, "count": count} for t_type, count in zip(types, counts)]
     
-    def _get_threat_type_breakdown(self):
-        """Get detailed threat type breakdown for visualization"""
-        pipeline = [
-            {
-                "$group": {
-                    "_id": {
-                        "type": "$type",
-                        "classification": "$classification"
-                    },
-                    "count": {"$sum": 1}
-                }
-            },
-            {"$sort": {"count": -1}}
-        ]
-        
-        try:
-            breakdown_data = list(self.db.iocs.aggregate(pipeline))
-            if breakdown_data:
-                return [
-                    {
-                        "type": item["_id"]["type"],
-                        "classification": item["_id"]["classification"],
-                        "count": item["count"]
-                    } for item in breakdown_data
-                ]
-        except Exception as e:
-            print(f"Error getting threat type breakdown: {e}")
+    def _get_threat_type_breakdown(self, breakdown_data):
+        """Format detailed threat type breakdown for visualization"""
+        if breakdown_data:
+            return [
+                {
+                    "type": item["_id"]["type"],
+                    "classification": item["_id"]["classification"],
+                    "count": item["count"]
+                } for item in breakdown_data
+            ]
         
         # Fallback mock data
-        import random
         threat_types = ["ip", "domain", "hash", "url"]
         classifications = ["critical", "high", "medium", "low"]
+        counts = self._rng.integers(1, 16, size=len(threat_types) * len(classifications)).tolist()
         
-        breakdown = []
-        for t_type in threat_types:
-            for classification in classifications:
-                breakdown.append({
-                    "type": t_type,
-                    "classification": classification,
-                    "count": random.randint(1, 15)
-                })
-        
-        return breakdown
-    
-    def _get_hourly_activity(self):
-        """Get hourly threat activity for the last 24 hours"""
-        now = datetime.utcnow()
-        hours_ago_24 = now - timedelta(hours=24)
-        
-        pipeline = [
-            {"$match": {"timestamp": {"$gte": hours_ago_24}}},
+        return [
             {
-                "$group": {
-                    "_id": {
-                        "hour": {"$hour": "$timestamp"},
-                        "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}
-                    },
-                    "count": {"$sum": 1}
-                }
-            },
-            {"$sort": {"_id.hour": 1}}
+                "type": t_type,
+                "classification": classification,
+                "count": count
+            } for (t_type, classification), count in zip(product(threat_types, classifications), counts)
         ]
-        
-        try:
-            hourly_data = list(self.db.iocs.aggregate(pipeline))
-            if hourly_data:
-                return [
-                    {
-                        "hour": item["_id"]["hour"],
-                        "count": item["count"]
-                    } for item in hourly_data
-                ]
-        except Exception as e:
-            print(f"Error getting hourly activity: {e}")
+    
+    def _get_hourly_activity(self, hourly_data):
+        """Format hourly threat activity for the last 24 hours"""
+        if hourly_data:
+            return [
+                {
+                    "hour": item["_id"]["hour"],
+                    "count": item["count"]
+                } for item in hourly_data
+            ]
         
         # Fallback mock data - simulate realistic hourly patterns
-        import random
-        hourly_activity = []
-        for hour in range(24):
-            # Simulate higher activity during business hours
-            if 8 <= hour <= 18:
-                base_count = random.randint(5, 15)
-            else:
-                base_count = random.randint(1, 8)
-            
-            hourly_activity.append({
-                "hour": hour,
-                "count": base_count
-            })
+        counts = np.where(BUSINESS_HOURS,
+                          self._rng.integers(5, 16, size=24),
+                          self._rng.integers(1, 9, size=24))
         
-        return hourly_activity
\ No newline at end of file
+        return [{"hour": hour, "count": count} for hour, count in enumerate(counts.tolist())]
@@ -4,14 +4,58 @@ Portable MongoDB setup for CTI Dashboard
 Downloads and runs MongoDB without installation
 """
 
+import hashlib
 import os
+import shutil
+import socket
 import sys
 import zipfile
 import requests
 import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+DOWNLOAD_PARTS = 8
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+def _download_range(url, part_path, start, end, validator=None):
+    """Download bytes start..end (inclusive) of url into part_path, resuming a partial part"""
+    have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if start + have > end:
+        return
+    
+    headers = {'Range': f'bytes={start + have}-{end}'}
+    if have and validator:
+        # Resume only if the remote file is unchanged; otherwise the server sends it whole
+        headers['If-Range'] = validator
+    response = requests.get(url, headers=headers, stream=True)
+    response.raise_for_status()
+    if response.status_code != 206:
+        response.close()
+        if not have:
+            raise RuntimeError("Server ignored the Range request")
+        os.remove(part_path)
+        return _download_range(url, part_path, start, end)
+    
+    response.raw.decode_content = True
+    with open(part_path, 'ab') as f:
+        shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
+
+def _verify_sha256(path, url):
+    """Check path against the .sha256 file MongoDB publishes next to each archive"""
+    response = requests.get(f"{url}.sha256")
+    if response.status_code != 200:
+        print("⚠️ No published checksum found, skipping verification")
+        return True
+    
+    expected = response.text.split()[0].lower()
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest() == expected
+
 def download_mongodb():
     """Download portable MongoDB for Windows"""
     print("📥 Downloading MongoDB Community Edition...")
@@ -21,12 +65,46 @@ def download_mongodb():
     mongodb_zip = "mongodb.zip"
     
     try:
-        response = requests.get(mongodb_url, stream=True)
-        response.raise_for_status()
+        head = requests.head(mongodb_url, allow_redirects=True)
+        head.raise_for_status()
+        length = int(head.headers.get('Content-Length', 0))
         
-        with open(mongodb_zip, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        if length and head.headers.get('Accept-Ranges') == 'bytes':
+            # Fetch the archive as parallel ranged GETs into per-part files; parts
+            # left over from an interrupted run are resumed rather than restarted
+            etag = head.headers.get('ETag', '')
+            validator = etag if etag and not etag.startswith('W/') else head.headers.get('Last-Modified')
+            
+            part_size = -(-length // DOWNLOAD_PARTS)
+            ranges = [(start, min(start + part_size, length) - 1)
+                      for start in range(0, length, part_size)]
+            parts = [f"{mongodb_zip}.part{index}" for index in range(len(ranges))]
+            with ThreadPoolExecutor(max_workers=DOWNLOAD_PARTS) as executor:
+                futures = [executor.submit(_download_range, head.url, part, start, end, validator)
+                           for part, (start, end) in zip(parts, ranges)]
+                for future in futures:
+                    future.result()
+            
+            with open(mongodb_zip, 'wb') as f:
+                for part in parts:
+                    with open(part, 'rb') as part_file:
+                        shutil.copyfileobj(part_file, f, length=DOWNLOAD_CHUNK_SIZE)
+        else:
+            parts = []
+            response = requests.get(mongodb_url, stream=True)
+            response.raise_for_status()
+            
+            response.raw.decode_content = True
+            with open(mongodb_zip, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
+        
+        # A mismatch means the parts can't be trusted for a resume either
+        verified = _verify_sha256(mongodb_zip, mongodb_url)
+        for part in parts:
+            os.remove(part)
+        if not verified:
+            os.remove(mongodb_zip)
+            raise RuntimeError("SHA256 checksum mismatch")
         
         print("✓ MongoDB downloaded successfully")
         return mongodb_zip
@@ -103,18 +181,26 @@ def start_mongodb():
             "--config", config_path
         ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         
-        # Wait a moment for MongoDB to start
-        time.sleep(3)
+        # Wait until mongod accepts connections (or exits / times out)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and process.poll() is None:
+            try:
+                socket.create_connection(("127.0.0.1", 27017), timeout=0.2).close()
+                print("✓ MongoDB server started successfully")
+                print("📊 MongoDB running on: mongodb://localhost:27017")
+                return process
+            except OSError:
+                time.sleep(0.05)
         
-        # Check if process is still running
         if process.poll() is None:
-            print("✓ MongoDB server started successfully")
-            print("📊 MongoDB running on: mongodb://localhost:27017")
-            return process
-        else:
+            process.terminate()
+        try:
+            stdout, stderr = process.communicate(timeout=1)
+        except subprocess.TimeoutExpired:
+            process.kill()
             stdout, stderr = process.communicate()
-            print(f"❌ MongoDB failed to start: {stderr.decode()}")
-            return None
+        print(f"❌ MongoDB failed to start: {stderr.decode()}")
+        return None
             
     except Exception as e:
         print(f"❌ Error starting MongoDB: {e}")
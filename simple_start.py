@@ -1,34 +1,67 @@
 #!/usr/bin/env python3
 """
 Simple CTI Dashboard Startup - Without SocketIO for compatibility
+
+Runs on Quart so I/O-bound routes don't pin a worker thread each:
+    hypercorn simple_start:app --workers 1 --worker-class asyncio
+
+Each worker has its own lookup cache, rate limiters and HTTP/2 client, so
+VirusTotal/AbuseIPDB quotas are spent once per worker (see CTI_WORKERS).
 """
 
-from flask import Flask, request, jsonify, render_template
-from flask_cors import CORS
+from quart import Quart, request, jsonify, render_template
+from quart.json.provider import DefaultJSONProvider
+from quart.utils import run_sync
+from quart_cors import cors
 from dotenv import load_dotenv
+import hashlib
+import orjson
 import os
+import redis.asyncio as aioredis
+import time
 from datetime import datetime, timedelta
 
+# Load .env before the service modules read their configuration
+load_dotenv()
+
 # Try to import services, but handle gracefully if MongoDB is not available
 try:
     from services.threat_intel import ThreatIntelService
     from services.database import DatabaseService
     from services.visualization import VisualizationService
+    from services.serialization import dumps
     SERVICES_AVAILABLE = True
 except Exception as e:
     print(f"⚠️ Services not available: {e}")
     SERVICES_AVAILABLE = False
 
-load_dotenv()
+class ORJSONProvider(DefaultJSONProvider):
+    """Route jsonify through orjson; non-native types fall back to Quart's defaults"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NAIVE_UTC).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
-app = Flask(__name__)
+app = Quart(__name__)
+app.json = ORJSONProvider(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'cti-dashboard-secret-key')
-CORS(app)
+app = cors(app)
+
+# Optional Redis cache for provider lookups and dashboard aggregations
+REDIS_URL = os.getenv('REDIS_URL')
+redis_cache = aioredis.from_url(REDIS_URL) if REDIS_URL else None
+CACHE_KEY_PREFIX = "cti_dashboard:"
 
 # Initialize services if available
 if SERVICES_AVAILABLE:
     try:
         db_service = DatabaseService()
+        # Open a pooled connection now so the first request doesn't pay the handshake
+        try:
+            db_service.client.admin.command('ping')
+        except Exception as e:
+            print(f"⚠️ MongoDB ping failed: {e}")
         threat_service = ThreatIntelService(db_service)
         viz_service = VisualizationService(db_service)
         print("✓ All services initialized successfully")
@@ -36,50 +69,110 @@ if SERVICES_AVAILABLE:
         print(f"⚠️ Service initialization failed: {e}")
         SERVICES_AVAILABLE = False
 
+async def cache_get(key):
+    """Fetch a cached JSON payload; a Redis outage counts as a miss"""
+    if redis_cache is None:
+        return None
+    try:
+        return await redis_cache.get(CACHE_KEY_PREFIX + key)
+    except Exception as e:
+        print(f"Redis cache read error: {e}")
+        return None
+
+async def cache_set(key, timeout, payload):
+    """Store an encoded JSON payload for `timeout` seconds"""
+    if redis_cache is None:
+        return
+    try:
+        await redis_cache.setex(CACHE_KEY_PREFIX + key, timeout, payload)
+    except Exception as e:
+        print(f"Redis cache write error: {e}")
+
+@app.after_serving
+async def close_clients():
+    """Release the pooled HTTP and Redis connections on shutdown"""
+    if SERVICES_AVAILABLE:
+        await run_sync(threat_service.close)()
+    if redis_cache is not None:
+        await redis_cache.aclose()
+
+def payload_response(payload, cached):
+    """Wrap an encoded payload in the success envelope without decoding it"""
+    body = dumps({"status": "success", "data": orjson.Fragment(payload), "cached": cached})
+    return app.response_class(body, mimetype='application/json')
+
+async def conditional_response(payload, cached, max_age):
+    """payload_response with an ETag; polls with a matching If-None-Match get a 304"""
+    response = payload_response(payload, cached)
+    response.set_etag(hashlib.md5(payload).hexdigest(), weak=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return await response.make_conditional(request)
+
+# /api/status timestamp, re-formatted at most once per second: [iso string, epoch]
+_STATUS_TS = ["", 0.0]
+
+def _status_timestamp():
+    """Cached ISO timestamp for health checks"""
+    now = time.time()
+    if now - _STATUS_TS[1] >= 1.0:
+        _STATUS_TS[0] = datetime.fromtimestamp(now).isoformat()
+        _STATUS_TS[1] = now
+    return _STATUS_TS[0]
+
 @app.route('/')
-def dashboard():
-    return render_template('dashboard.html')
+async def dashboard():
+    return await render_template('dashboard.html')
 
 @app.route('/api/status', methods=['GET'])
-def get_status():
+async def get_status():
     return jsonify({
         "status": "success",
         "message": "CTI Dashboard is running",
         "services_available": SERVICES_AVAILABLE,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": _status_timestamp()
     })
 
 @app.route('/api/fetch-feeds', methods=['POST'])
-def fetch_feeds():
+async def fetch_feeds():
     if not SERVICES_AVAILABLE:
         return jsonify({"status": "error", "message": "Services not available"}), 503
     
     try:
-        result = threat_service.fetch_all_feeds()
+        # Downloads are awaited on the service loop; only the DB writes use a thread
+        result = await threat_service.fetch_all_feeds_async()
         return jsonify({"status": "success", "data": result})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/lookup', methods=['POST'])
-def lookup_ioc():
+async def lookup_ioc():
     if not SERVICES_AVAILABLE:
         return jsonify({"status": "error", "message": "Services not available"}), 503
     
     try:
-        data = request.get_json()
+        data = await request.get_json()
         ioc = data.get('ioc')
         ioc_type = data.get('type')
         
         if not ioc or not ioc_type:
             return jsonify({"status": "error", "message": "IOC and type required"}), 400
         
-        result = threat_service.lookup_ioc(ioc, ioc_type)
-        return jsonify({"status": "success", "data": result})
+        key = f"ioc:{ioc_type}:{ioc}"
+        cached = await cache_get(key)
+        if cached is not None:
+            return payload_response(cached, True)
+        
+        result = await run_sync(threat_service.lookup_ioc)(ioc, ioc_type)
+        payload = dumps(result)
+        if result:
+            await cache_set(key, 3600, payload)
+        return payload_response(payload, False)
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/visuals/dashboard', methods=['GET'])
-def get_dashboard_data():
+async def get_dashboard_data():
     if not SERVICES_AVAILABLE:
         return jsonify({
             "status": "success", 
@@ -92,18 +185,36 @@ def get_dashboard_data():
         })
     
     try:
-        data = viz_service.get_dashboard_metrics()
-        return jsonify({"status": "success", "data": data})
+        cached = await cache_get("dashboard")
+        if cached is not None:
+            return await conditional_response(cached, True, 15)
+        
+        payload = dumps(await run_sync(viz_service.get_dashboard_metrics)())
+        await cache_set("dashboard", 30, payload)
+        return await conditional_response(payload, False, 15)
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 if __name__ == '__main__':
     print("🛡️ CTI Dashboard - Simple Mode")
     print("=" * 50)
-    print("🚀 Starting Flask application...")
+    print("🚀 Starting Quart application...")
     print("📊 Dashboard will be available at: http://localhost:5000")
     if not SERVICES_AVAILABLE:
         print("⚠️ Running in demo mode - some features may be limited")
     print("=" * 50)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    if os.getenv('CTI_DEV'):
+        # Development server with debugger and reloader
+        app.run(debug=True, host='0.0.0.0', port=5000)
+    else:
+        from hypercorn.config import Config
+        from hypercorn.run import run
+        
+        config = Config()
+        config.application_path = "simple_start:app"
+        config.bind = ["0.0.0.0:5000"]
+        config.worker_class = "asyncio"
+        # Provider rate limits are per worker, so more workers multiply the quota use
+        config.workers = int(os.getenv('CTI_WORKERS', '1'))
+        run(config)
\ No newline at end of file
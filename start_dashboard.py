@@ -4,12 +4,26 @@ CTI Dashboard Quick Start Script
 Handles setup and launches the real-time dashboard
 """
 
+import functools
+import hashlib
+import json
 import os
+import shutil
+import socket
 import sys
 import subprocess
 import time
 from pathlib import Path
 
+# Platform-specific paths, resolved once
+_IS_WIN = os.name == 'nt'
+VENV_PY = os.path.join("venv", "Scripts", "python.exe") if _IS_WIN else os.path.join("venv", "bin", "python")
+VENV_PIP = os.path.join("venv", "Scripts", "pip.exe") if _IS_WIN else os.path.join("venv", "bin", "pip")
+MONGOD = os.path.join("mongodb", "bin", "mongod.exe" if _IS_WIN else "mongod")
+
+# Written after a successful setup; warm starts with matching state skip straight to launch
+SETUP_SENTINEL = ".cti-setup-ok"
+
 def print_banner():
     """Print startup banner"""
     print("=" * 60)
@@ -17,6 +31,7 @@ def print_banner():
     print("=" * 60)
     print()
 
+@functools.lru_cache(maxsize=1)
 def check_python():
     """Check Python version"""
     if sys.version_info < (3, 8):
@@ -25,40 +40,65 @@ def check_python():
     print("✓ Python version:", sys.version.split()[0])
     return True
 
+def _venv_valid():
+    """Check the venv has its interpreter and base Python, built for this Python version"""
+    cfg_path = os.path.join("venv", "pyvenv.cfg")
+    if not (os.path.exists(cfg_path) and os.path.exists(VENV_PY)):
+        return False
+    
+    cfg = {}
+    with open(cfg_path) as f:
+        for line in f:
+            key, sep, value = line.partition("=")
+            if sep:
+                cfg[key.strip()] = value.strip()
+    
+    version = ".".join(cfg.get("version", "").split(".")[:2])
+    return (os.path.isdir(cfg.get("home", "")) and
+            version == f"{sys.version_info[0]}.{sys.version_info[1]}")
+
 def setup_venv():
     """Setup virtual environment"""
-    if not os.path.exists("venv"):
-        print("📦 Creating virtual environment...")
-        try:
-            subprocess.run([sys.executable, "-m", "venv", "venv"], check=True)
-            print("✓ Virtual environment created")
-        except subprocess.CalledProcessError:
-            print("❌ Failed to create virtual environment")
-            return False
-    else:
-        print("✓ Virtual environment exists")
+    if _venv_valid():
+        print("✓ Virtual environment valid")
+        return True
+    
+    # A missing, half-created or stale venv is (re)built from scratch
+    print("📦 Creating virtual environment...")
+    try:
+        subprocess.run([sys.executable, "-m", "venv", "--clear", "venv"], check=True)
+        print("✓ Virtual environment created")
+    except subprocess.CalledProcessError:
+        print("❌ Failed to create virtual environment")
+        return False
     return True
 
 def install_dependencies():
     """Install Python dependencies"""
-    print("📚 Installing dependencies...")
+    # Skip the install entirely when requirements.txt hasn't changed since the last one
+    stamp_path = os.path.join("venv", ".reqs.sha256")
+    with open("requirements.txt", "rb") as f:
+        reqs_hash = hashlib.sha256(f.read()).hexdigest()
+    if os.path.exists(stamp_path):
+        with open(stamp_path) as f:
+            if f.read().strip() == reqs_hash:
+                print("✓ Dependencies up to date")
+                return True
     
-    # Determine pip path based on OS
-    if os.name == 'nt':  # Windows
-        pip_path = os.path.join("venv", "Scripts", "pip.exe")
-        python_path = os.path.join("venv", "Scripts", "python.exe")
-    else:  # Unix/Linux/Mac
-        pip_path = os.path.join("venv", "bin", "pip")
-        python_path = os.path.join("venv", "bin", "python")
+    print("📚 Installing dependencies...")
     
     try:
-        # Upgrade pip first
-        subprocess.run([python_path, "-m", "pip", "install", "--upgrade", "pip"], 
-                      check=True, capture_output=True)
+        if shutil.which("uv"):
+            subprocess.run(["uv", "pip", "install", "--python", VENV_PY, "-r", "requirements.txt"],
+                          check=True)
+        else:
+            subprocess.run([VENV_PIP, "install", "--prefer-binary", "--no-input",
+                            "--disable-pip-version-check", "--progress-bar=on",
+                            "-r", "requirements.txt"],
+                          check=True)
         
-        # Install requirements
-        subprocess.run([pip_path, "install", "-r", "requirements.txt"], 
-                      check=True, capture_output=True)
+        with open(stamp_path, "w") as f:
+            f.write(reqs_hash)
         print("✓ Dependencies installed successfully")
         return True
     except subprocess.CalledProcessError as e:
@@ -70,8 +110,7 @@ def setup_env_file():
     if not os.path.exists(".env"):
         print("⚙️ Creating .env file from template...")
         try:
-            with open(".env.example", "r") as src, open(".env", "w") as dst:
-                dst.write(src.read())
+            shutil.copyfile(".env.example", ".env")
             print("✓ .env file created")
             print()
             print("⚠️  IMPORTANT: Please add your API keys to .env file:")
@@ -85,20 +124,37 @@ def setup_env_file():
         print("✓ .env file exists")
     return True
 
+def _mongo_tcp_up(timeout=0.2):
+    """Fast TCP probe of the local MongoDB port"""
+    try:
+        socket.create_connection(("localhost", 27017), timeout=timeout).close()
+        return True
+    except OSError:
+        return False
+
+@functools.lru_cache(maxsize=1)
+def _mongo_ready():
+    """TCP probe first; only a listening port gets the full wire-protocol handshake"""
+    if not _mongo_tcp_up():
+        return False
+    try:
+        import pymongo
+        client = pymongo.MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=500)
+        client.server_info()
+        return True
+    except Exception:
+        return False
+
 def check_mongodb():
     """Check if MongoDB is available"""
     print("🗄️ Checking MongoDB...")
     
-    # Try to connect to MongoDB
-    try:
-        import pymongo
-        client = pymongo.MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=2000)
-        client.server_info()
+    if _mongo_ready():
         print("✓ MongoDB is running")
         return True
-    except Exception:
-        print("⚠️ MongoDB not detected")
-        return setup_portable_mongodb()
+    
+    print("⚠️ MongoDB not detected")
+    return setup_portable_mongodb()
 
 def setup_portable_mongodb():
     """Setup portable MongoDB if needed"""
@@ -134,19 +190,14 @@ def download_portable_mongodb():
         print("📥 Downloading MongoDB (this may take a few minutes)...")
         
         # Run the portable MongoDB setup
-        if os.name == 'nt':  # Windows
-            python_path = os.path.join("venv", "Scripts", "python.exe")
-        else:
-            python_path = os.path.join("venv", "bin", "python")
-        
-        result = subprocess.run([python_path, "setup_portable_mongodb.py"], 
-                              capture_output=True, text=True)
+        # Output goes straight to the terminal so download progress stays visible
+        result = subprocess.run([VENV_PY, "setup_portable_mongodb.py"])
         
         if result.returncode == 0:
             print("✓ Portable MongoDB setup complete")
             return True
         else:
-            print(f"❌ MongoDB setup failed: {result.stderr}")
+            print(f"❌ MongoDB setup failed (exit code {result.returncode})")
             return False
             
     except Exception as e:
@@ -156,16 +207,24 @@ def download_portable_mongodb():
 def start_portable_mongodb():
     """Start portable MongoDB"""
     try:
-        mongod_path = os.path.join("mongodb", "bin", "mongod.exe" if os.name == 'nt' else "mongod")
         config_path = os.path.join("mongodb", "mongod.conf")
         
-        if os.path.exists(mongod_path):
+        if os.path.exists(MONGOD):
             print("🚀 Starting portable MongoDB...")
-            subprocess.Popen([mongod_path, "--config", config_path], 
-                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            time.sleep(3)  # Give MongoDB time to start
-            print("✓ MongoDB started")
-            return True
+            process = subprocess.Popen([MONGOD, "--config", config_path], 
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            
+            # Poll the port until mongod accepts connections (up to 5s)
+            deadline = time.monotonic() + 5.0
+            while time.monotonic() < deadline and process.poll() is None:
+                if _mongo_tcp_up(timeout=0.1):
+                    _mongo_ready.cache_clear()
+                    print("✓ MongoDB started")
+                    return True
+                time.sleep(0.05)
+            
+            print("❌ MongoDB did not become ready in 5s")
+            return False
     except Exception as e:
         print(f"❌ Failed to start MongoDB: {e}")
     return False
@@ -199,24 +258,42 @@ def start_dashboard():
     print("=" * 60)
     
     try:
-        # Determine Python path
-        if os.name == 'nt':  # Windows
-            python_path = os.path.join("venv", "Scripts", "python.exe")
-        else:
-            python_path = os.path.join("venv", "bin", "python")
-        
         # Start the dashboard
-        subprocess.run([python_path, "run.py"])
+        subprocess.run([VENV_PY, "run.py"])
         
     except KeyboardInterrupt:
         print("\n👋 CTI Dashboard stopped by user")
     except Exception as e:
         print(f"\n❌ Error starting dashboard: {e}")
 
+def _setup_state():
+    """Inputs that the setup steps depend on"""
+    with open("requirements.txt", "rb") as f:
+        reqs_hash = hashlib.sha256(f.read()).hexdigest()
+    return {
+        "python": list(sys.version_info[:2]),
+        "venv": os.path.exists(VENV_PY),
+        "requirements": reqs_hash,
+        "env_mtime": os.path.getmtime(".env") if os.path.exists(".env") else 0
+    }
+
 def main():
     """Main function"""
     print_banner()
     
+    state = _setup_state()
+    if os.path.exists(SETUP_SENTINEL):
+        with open(SETUP_SENTINEL) as f:
+            try:
+                cached_state = json.load(f)
+            except ValueError:
+                cached_state = None
+        if cached_state == state:
+            print("✓ Setup unchanged since last run - skipping checks")
+            check_mongodb()  # Still starts portable MongoDB if it isn't running
+            start_dashboard()
+            return
+    
     # Check prerequisites
     if not check_python():
         sys.exit(1)
@@ -232,6 +309,10 @@ def main():
     
     check_mongodb()  # MongoDB is optional
     
+    # Setup may have created the venv or .env, so record the state as it is now
+    with open(SETUP_SENTINEL, "w") as f:
+        json.dump(_setup_state(), f)
+    
     print()
     print("🎉 Setup complete! Starting dashboard...")
     print()
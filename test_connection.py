@@ -5,15 +5,44 @@ Test database connection and basic functionality
 
 import os
 import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+# One DatabaseService shared by every test
+_db = None
+
+def _get_db():
+    """Create the shared DatabaseService on first use"""
+    global _db
+    if _db is None:
+        from services.database import DatabaseService
+        _db = DatabaseService()
+    return _db
+
+def _remove_bulk_test_iocs(db_service):
+    """Delete the bulk test IOCs and take them back out of the dashboard metrics"""
+    query = {'description': 'Bulk test IOC'}
+    counts = Counter(
+        (ioc['timestamp'].strftime('%Y-%m-%d'), ioc.get('classification') or 'unknown')
+        for ioc in db_service.iocs.find(query, {'timestamp': 1, 'classification': 1})
+    )
+    
+    for (date, classification), count in counts.items():
+        db_service.metrics_daily.update_one(
+            {'date': date, 'classification': classification}, {'$inc': {'count': -count}}
+        )
+        db_service.metrics_summary.update_one(
+            {'_id': classification}, {'$inc': {'count': -count}}
+        )
+    db_service.iocs.delete_many(query)
+
 def test_mongodb_connection():
     """Test MongoDB connection"""
     try:
-        from services.database import DatabaseService
-        
         print("Testing MongoDB connection...")
-        db_service = DatabaseService()
+        db_service = _get_db()
         
         # Test basic operations
         test_ioc = {
@@ -30,6 +59,19 @@ def test_mongodb_connection():
         ioc_id = db_service.store_ioc(test_ioc)
         print(f"✓ Successfully stored test IOC: {ioc_id}")
         
+        # Store a batch through the bulk upsert path
+        test_iocs = [
+            dict(test_ioc, value=f'192.0.2.{i}', description='Bulk test IOC')
+            for i in range(100)
+        ]
+        start = time.perf_counter()
+        try:
+            stored = db_service.bulk_store_iocs(test_iocs)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"✓ Bulk stored {stored} test IOCs in {elapsed_ms:.1f}ms")
+        finally:
+            _remove_bulk_test_iocs(db_service)
+        
         # Get threat stats
         stats = db_service.get_threat_stats()
         print(f"✓ Retrieved threat stats: {stats['total_iocs']} total IOCs")
@@ -51,7 +93,6 @@ def test_mongodb_connection():
 def test_realtime_service():
     """Test real-time service"""
     try:
-        from services.database import DatabaseService
         from services.realtime_feeds import RealtimeFeedService
         
         print("\nTesting real-time service...")
@@ -61,7 +102,7 @@ def test_realtime_service():
             def emit(self, event, data):
                 print(f"Mock emit: {event} - {type(data)}")
         
-        db_service = DatabaseService()
+        db_service = _get_db()
         realtime_service = RealtimeFeedService(db_service, MockSocketIO())
         
         # Test live stats
@@ -83,15 +124,20 @@ def main():
     # Load environment
     load_dotenv()
     
-    # Run tests
-    tests_passed = 0
-    total_tests = 2
+    # Connect once up front; both tests reuse this service
+    try:
+        _get_db()
+    except Exception as e:
+        print(f"❌ Could not initialize DatabaseService: {e}")
+        return False
     
-    if test_mongodb_connection():
-        tests_passed += 1
+    # Run tests concurrently; they share the (thread-safe) pooled client
+    tests = [test_mongodb_connection, test_realtime_service]
+    total_tests = len(tests)
     
-    if test_realtime_service():
-        tests_passed += 1
+    with ThreadPoolExecutor(max_workers=total_tests) as executor:
+        futures = [executor.submit(test) for test in tests]
+        tests_passed = sum(future.result() for future in futures)
     
     print("\n" + "=" * 50)
     print(f"Tests completed: {tests_passed}/{total_tests} passed")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+CTI Dashboard Background Worker
+Runs the scheduler and real-time monitoring outside the web process and
+emits to connected clients through the Redis message queue
+"""
+
+import eventlet
+eventlet.monkey_patch()
+
+import os
+import time
+from dotenv import load_dotenv
+from flask_socketio import SocketIO
+
+# Load .env before the service modules read their configuration
+load_dotenv()
+
+from services.threat_intel import ThreatIntelService
+from services.database import DatabaseService
+from services.realtime_feeds import RealtimeFeedService
+from services.scheduler import create_scheduler
+from services.serialization import socketio_options
+
+def main():
+    """Main worker function"""
+    # Emit-only Socket.IO client; no Flask app needed
+    socketio = SocketIO(message_queue=os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+                        **socketio_options())
+    
+    db_service = DatabaseService()
+    threat_service = ThreatIntelService(db_service)
+    realtime_service = RealtimeFeedService(db_service, socketio)
+    
+    scheduler = create_scheduler(db_service, threat_service, realtime_service)
+    scheduler.start()
+    realtime_service.start_monitoring()
+    print("⚙️ CTI Dashboard worker running")
+    
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print("\n👋 Stopping CTI Dashboard worker...")
+    finally:
+        realtime_service.stop_monitoring()
+        scheduler.shutdown()
+        threat_service.close()
+
+if __name__ == "__main__":
+    main()